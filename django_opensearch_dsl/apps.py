@@ -44,3 +44,13 @@ class DODConfig(AppConfig):
     def default_queryset_pagination(cls):
         """Return `OPENSEARCH_DSL_QUERYSET_PAGINATION`."""
         return getattr(settings, "OPENSEARCH_DSL_QUERYSET_PAGINATION", 4096)
+
+    @classmethod
+    def default_parallel_thread_count(cls):
+        """Return `OPENSEARCH_DSL_PARALLEL_THREAD_COUNT`."""
+        return getattr(settings, "OPENSEARCH_DSL_PARALLEL_THREAD_COUNT", 4)
+
+    @classmethod
+    def default_parallel_queue_size(cls):
+        """Return `OPENSEARCH_DSL_PARALLEL_QUEUE_SIZE`."""
+        return getattr(settings, "OPENSEARCH_DSL_PARALLEL_QUEUE_SIZE", 4)
@@ -54,7 +54,16 @@ class Document(DSLDocument):
         # related instances to ignore is required to remove the instance
         # from related models on deletion.
         self._related_instance_to_ignore = related_instance_to_ignore
-        self._prepared_fields = self.init_prepare()
+        if related_instance_to_ignore is None:
+            # The compiled preparers only depend on the class, cache them on
+            # the class so repeated instantiations on the bulk-indexing path
+            # skip the field resolution work entirely.
+            if "_prepared_fields" not in type(self).__dict__:
+                type(self)._prepared_fields = self.init_prepare()
+        else:
+            # Preparers capture `related_instance_to_ignore`, which is
+            # instance-specific, so they cannot be shared in that case.
+            self._prepared_fields = self.init_prepare()
 
     @classmethod
     def search(cls, using=None, index=None):
@@ -95,31 +104,32 @@ class Document(DSLDocument):
         action: OpensearchAction = OpensearchAction.INDEX,
         stdout: io.FileIO = sys.stdout,
     ) -> Iterable:
-        """Divide the queryset into chunks."""
+        """Stream the queryset in chunks, ordered by primary key.
+
+        `QuerySet.iterator()` keeps one chunk of rows in memory at a time and
+        avoids the growing `LIMIT/OFFSET` cost of slicing the queryset
+        repeatedly.
+        """
         chunk_size = self.django.queryset_pagination
         qs = self.get_queryset(filter_=filter_, exclude=exclude, count=count)
         qs = qs.order_by("pk") if not qs.query.is_sliced else qs
-        count = qs.count()
         model = self.django.model.__name__
         action = action.present_participle.title()
 
-        i = 0
         done = 0
         start = time.time()
         if verbose:
+            count = qs.count()
             stdout.write(f"{action} {model}: 0% ({self._eta(start, done, count)})\r")
-        while done < count:
-            if verbose:
-                stdout.write(f"{action} {model}: {round(i / count * 100)}% ({self._eta(start, done, count)})\r")
-
-            for obj in qs[i : i + chunk_size]:
-                done += 1
-                yield obj
 
-            i = min(i + chunk_size, count)
+        for obj in qs.iterator(chunk_size=chunk_size):
+            if verbose and done % chunk_size == 0:
+                stdout.write(f"{action} {model}: {round(done / count * 100)}% ({self._eta(start, done, count)})\r")
+            done += 1
+            yield obj
 
         if verbose:
-            stdout.write(f"{action} {count} {model}: OK          \n")
+            stdout.write(f"{action} {done} {model}: OK          \n")
 
     def init_prepare(self):
         """Initialise the data model preparers once here.
@@ -177,6 +187,8 @@ class Document(DSLDocument):
     def parallel_bulk(self, actions, using=None, **kwargs):
         """Parallel version of `bulk`."""
         kwargs.setdefault("chunk_size", self.django.queryset_pagination)
+        kwargs.setdefault("thread_count", self.django.parallel_thread_count)
+        kwargs.setdefault("queue_size", self.django.parallel_queue_size)
         bulk_actions = parallel_bulk(client=self._get_connection(using), actions=actions, **kwargs)
         # As the `parallel_bulk` is lazy, we need to get it into `deque` to run
         # it instantly.
@@ -46,6 +46,12 @@ class DocumentRegistry:
                 "queryset_pagination": getattr(
                     document.Django, "queryset_pagination", DODConfig.default_queryset_pagination()
                 ),
+                "parallel_thread_count": getattr(
+                    django_meta, "parallel_thread_count", DODConfig.default_parallel_thread_count()
+                ),
+                "parallel_queue_size": getattr(
+                    django_meta, "parallel_queue_size", DODConfig.default_parallel_queue_size()
+                ),
                 "ignore_signals": getattr(django_meta, "ignore_signals", False),
                 "auto_refresh": getattr(django_meta, "auto_refresh", DODConfig.auto_refresh_enabled()),
                 "related_models": getattr(django_meta, "related_models", []),
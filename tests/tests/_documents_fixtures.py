@@ -0,0 +1,186 @@
+"""Model and document fixtures shared by the document test cases.
+
+Defining a ``Document`` subclass runs the full DSL metaclass, the registry
+registration and the mapping build, so the documents used by the tests are
+declared once at module scope instead of inside every test method needing
+them.
+"""
+import functools
+
+from django.db import models
+from opensearchpy.helpers.document import InnerDoc
+from opensearchpy.helpers.field import GeoPoint
+
+from django_opensearch_dsl import fields
+from django_opensearch_dsl.apps import DODConfig
+from django_opensearch_dsl.documents import Document
+from django_opensearch_dsl.registries import DocumentRegistry
+
+registry = DocumentRegistry()
+
+
+class Car(models.Model):
+    name = models.CharField(max_length=255)
+    price = models.FloatField()
+    not_indexed = models.TextField()
+    manufacturer = models.ForeignKey("Manufacturer", null=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        app_label = "car"
+
+    def type(self):
+        return "break"
+
+
+class Manufacturer(models.Model):
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        app_label = "car"
+
+
+class Article(models.Model):
+    slug = models.CharField(
+        max_length=255,
+        unique=True,
+    )
+
+    class Meta:
+        app_label = "tests"
+
+    def __str__(self):
+        return self.slug
+
+
+@registry.register_document
+class CarDocument(Document):
+    color = fields.TextField()
+    type = fields.TextField()
+
+    def prepare_color(self, instance):
+        return "blue"
+
+    class Meta:
+        doc_type = "car_document"
+
+    class Django:
+        fields = ["name", "price"]
+        model = Car
+        related_models = [Manufacturer]
+
+    class Index:
+        name = "car_index"
+        doc_type = "car_document"
+        auto_refresh = True
+
+
+@registry.register_document
+class CarDocumentAutoRefreshOff(Document):
+    class Django:
+        model = Car
+
+    class Index:
+        auto_refresh = False
+
+
+@registry.register_document
+class CarDocumentPaginated(Document):
+    class Django:
+        model = Car
+        queryset_pagination = 120
+
+
+class ManufacturerInnerDoc(InnerDoc):
+    name = fields.TextField()
+    location = fields.TextField()
+
+    def prepare_location(self, instance):
+        return "USA"
+
+
+@registry.register_document
+class CarDocumentWithInnerDoc(Document):
+    manufacturer = fields.ObjectField(doc_class=ManufacturerInnerDoc)
+
+    class Django:
+        model = Car
+        fields = ["name", "price"]
+
+    class Index:
+        name = "car_index"
+
+
+@registry.register_document
+class CarDocumentDSlBaseField(Document):
+    position = GeoPoint()
+
+    class Django:
+        model = Car
+        fields = ["name", "price"]
+
+    class Index:
+        name = "car_index"
+
+
+@registry.register_document
+class ArticleDocument(Document):
+    class Django:
+        model = Article
+        fields = [
+            "slug",
+        ]
+
+    class Index:
+        name = "test_articles"
+        settings = {
+            "number_of_shards": 1,
+            "number_of_replicas": 0,
+        }
+
+
+@registry.register_document
+class ArticleDocumentCustomId(Document):
+    class Django:
+        model = Article
+        fields = [
+            "slug",
+        ]
+
+    class Index:
+        name = "test_articles"
+
+    @classmethod
+    def generate_id(cls, article):
+        return article.slug
+
+
+def article_document_with_index_settings(index_settings=None):
+    """Return an ``ArticleDocument`` registered with the given index settings.
+
+    Index settings are merged with ``OPENSEARCH_DSL_INDEX_SETTINGS`` at
+    registration time, so the class must be built while the expected global
+    settings are active. Each unique settings combination is only built once
+    across the whole run.
+    """
+    global_settings = tuple(sorted(DODConfig.default_index_settings().items()))
+    index_settings = tuple(sorted((index_settings or {}).items()))
+    return _build_article_document(global_settings, index_settings)
+
+
+@functools.lru_cache(maxsize=None)
+def _build_article_document(global_settings, index_settings):
+    settings_ = dict(index_settings)
+
+    @registry.register_document
+    class ArticleDocument(Document):
+        class Django:
+            model = Article
+            fields = [
+                "slug",
+            ]
+
+        class Index:
+            name = "test_articles"
+            settings = settings_
+
+    return ArticleDocument
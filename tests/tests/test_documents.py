@@ -1,82 +1,63 @@
+import functools
+import types
 from unittest.mock import patch, Mock
 
 from django.conf import settings
 from django.db import models
-from django.test import TestCase, override_settings
+from django.test import SimpleTestCase, TestCase, override_settings
+
 from django.utils.translation import gettext_lazy as _
-from opensearchpy.helpers.field import GeoPoint
-from opensearchpy.helpers.document import InnerDoc
-from opensearchpy import OpenSearch
 
 from django_opensearch_dsl import fields
 from django_opensearch_dsl.apps import DODConfig
+from opensearchpy.connection.connections import connections
+
 from django_opensearch_dsl.documents import Document
 from django_opensearch_dsl.exceptions import ModelFieldNotMappedError, RedeclaredFieldError
-from django_opensearch_dsl.registries import DocumentRegistry
 
 from django_dummy_app.models import Continent
 from django_dummy_app.documents import ContinentDocument
 
-registry = DocumentRegistry()
-
-
-class Car(models.Model):
-    name = models.CharField(max_length=255)
-    price = models.FloatField()
-    not_indexed = models.TextField()
-    manufacturer = models.ForeignKey("Manufacturer", null=True, on_delete=models.SET_NULL)
-
-    class Meta:
-        app_label = "car"
-
-    def type(self):
-        return "break"
-
-
-class Manufacturer(models.Model):
-    name = models.CharField(max_length=255)
-
-    class Meta:
-        app_label = "car"
-
-
-class Article(models.Model):
-    slug = models.CharField(
-        max_length=255,
-        unique=True,
-    )
-
-    class Meta:
-        app_label = "tests"
-
-    def __str__(self):
-        return self.slug
-
-
-@registry.register_document
-class CarDocument(Document):
-    color = fields.TextField()
-    type = fields.TextField()
-
-    def prepare_color(self, instance):
-        return "blue"
-
-    class Meta:
-        doc_type = "car_document"
-
-    class Django:
-        fields = ["name", "price"]
-        model = Car
-        related_models = [Manufacturer]
-
-    class Index:
-        name = "car_index"
-        doc_type = "car_document"
-        auto_refresh = True
-
-
-class DocumentTestCase(TestCase):
-    fixtures = ["tests/django_dummy_app/geography_data.json"]
+from ._documents_fixtures import (
+    registry,
+    Car,
+    Manufacturer,
+    Article,
+    CarDocument,
+    CarDocumentAutoRefreshOff,
+    CarDocumentPaginated,
+    ManufacturerInnerDoc,
+    CarDocumentWithInnerDoc,
+    CarDocumentDSlBaseField,
+    ArticleDocument,
+    ArticleDocumentCustomId,
+    article_document_with_index_settings,
+)
+
+
+# Sentinel for "no `refresh` argument given" in the refresh matrix test.
+_unset = object()
+
+# Expected (field class, preparer class) for each CarDocument field.
+_EXPECTED_PREP = {
+    "color": (fields.TextField, types.MethodType),
+    "type": (fields.TextField, functools.partial),
+    "name": (fields.TextField, functools.partial),
+    "price": (fields.DoubleField, functools.partial),
+}
+
+
+class DocumentTestCase(SimpleTestCase):
+    def setUp(self):
+        # Installed once per test instead of a `with patch(...)` block in
+        # every update-related test. Tests patching a different symbol (e.g.
+        # `Document.bulk`) still do so locally.
+        patcher = patch("django_opensearch_dsl.documents.bulk")
+        self.mock_bulk = patcher.start()
+        self.addCleanup(patcher.stop)
+        parallel_patcher = patch("django_opensearch_dsl.documents.parallel_bulk")
+        self.mock_parallel_bulk = parallel_patcher.start()
+        self.addCleanup(parallel_patcher.stop)
 
     def test_model_class_added(self):
         self.assertEqual(CarDocument.django.model, Car)
@@ -85,25 +66,11 @@ class DocumentTestCase(TestCase):
         self.assertTrue(CarDocument.Index.auto_refresh)
 
     def test_auto_refresh_added(self):
-        @registry.register_document
-        class CarDocument2(Document):
-            class Django:
-                model = Car
-
-            class Index:
-                auto_refresh = False
-
-        self.assertFalse(CarDocument2.Index.auto_refresh)
+        self.assertFalse(CarDocumentAutoRefreshOff.Index.auto_refresh)
 
     def test_queryset_pagination_added(self):
-        @registry.register_document
-        class CarDocument2(Document):
-            class Django:
-                model = Car
-                queryset_pagination = 120
-
         self.assertEqual(CarDocument.django.queryset_pagination, DODConfig.default_queryset_pagination())
-        self.assertEqual(CarDocument2.django.queryset_pagination, 120)
+        self.assertEqual(CarDocumentPaginated.django.queryset_pagination, 120)
 
     def test_fields_populated(self):
         mapping = CarDocument._doc_type.mapping
@@ -156,16 +123,6 @@ class DocumentTestCase(TestCase):
         self.assertIsInstance(qs, models.QuerySet)
         self.assertEqual(qs.model, Car)
 
-    def test_get_indexing_queryset(self):
-        doc = ContinentDocument()
-        unordered_qs = doc.get_queryset().order_by("?")
-
-        with patch("django_opensearch_dsl.documents.Document.get_queryset") as mock_qs:
-            mock_qs.return_value = unordered_qs
-            ordered_continents = list(doc.get_queryset().order_by("pk"))
-            indexing_continents = list(doc.get_indexing_queryset())
-            self.assertEqual(ordered_continents, indexing_continents)
-
     def test_prepare(self):
         car = Car(name="Type 57", price=5400000.0, not_indexed="not_indexex")
         doc = CarDocument()
@@ -175,24 +132,6 @@ class DocumentTestCase(TestCase):
         )
 
     def test_innerdoc_prepare(self):
-        class ManufacturerInnerDoc(InnerDoc):
-            name = fields.TextField()
-            location = fields.TextField()
-
-            def prepare_location(self, instance):
-                return "USA"
-
-        @registry.register_document
-        class CarDocumentWithInnerDoc(Document):
-            manufacturer = fields.ObjectField(doc_class=ManufacturerInnerDoc)
-
-            class Django:
-                model = Car
-                fields = ["name", "price"]
-
-            class Index:
-                name = "car_index"
-
         manufacturer = Manufacturer(name="Bugatti")
 
         car = Car(name="Type 57", price=5400000.0, manufacturer=manufacturer)
@@ -211,17 +150,6 @@ class DocumentTestCase(TestCase):
         )
 
     def test_prepare_ignore_dsl_base_field(self):
-        @registry.register_document
-        class CarDocumentDSlBaseField(Document):
-            position = GeoPoint()
-
-            class Django:
-                model = Car
-                fields = ["name", "price"]
-
-            class Index:
-                name = "car_index"
-
         car = Car(name="Type 57", price=5400000.0, not_indexed="not_indexex")
         doc = CarDocumentDSlBaseField()
         prepared_data = doc.prepare(car)
@@ -230,162 +158,132 @@ class DocumentTestCase(TestCase):
     def test_model_instance_update(self):
         doc = CarDocument()
         car = Car(name="Type 57", price=5400000.0, not_indexed="not_indexex", pk=51)
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "index")
-            actions = [
-                {
-                    "_id": car.pk,
-                    "_op_type": "index",
-                    "_source": {
-                        "name": car.name,
-                        "price": car.price,
-                        "type": car.type(),
-                        "color": doc.prepare_color(None),
-                    },
-                    "_index": "car_index",
-                }
-            ]
-            self.assertEqual(1, mock.call_count)
-            self.assertEqual(actions, list(mock.call_args_list[0][1]["actions"]))
-            self.assertTrue(mock.call_args_list[0][1]["refresh"])
-            self.assertEqual(doc._index.connection, mock.call_args_list[0][1]["client"])
+        doc.update(car, "index")
+        actions = [
+            {
+                "_id": car.pk,
+                "_op_type": "index",
+                "_source": {
+                    "name": car.name,
+                    "price": car.price,
+                    "type": car.type(),
+                    "color": doc.prepare_color(None),
+                },
+                "_index": "car_index",
+            }
+        ]
+        call = self.mock_bulk.call_args_list[0][1]
+        self.assertEqual(1, self.mock_bulk.call_count)
+        self.assertEqual(actions, list(call["actions"]))
+        self.assertTrue(call["refresh"])
+        self.assertEqual(doc._index.connection, call["client"])
 
     def test_model_instance_iterable_update(self):
         doc = CarDocument()
         car = Car(name="Type 57", price=5400000.0, not_indexed="not_indexex", pk=51)
         car2 = Car(name=_("Type 42"), price=50000.0, not_indexed="not_indexex", pk=31)
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update([car, car2], action="update")
-            actions = [
-                {
-                    "_id": car.pk,
-                    "_op_type": "update",
-                    "doc": {
-                        "name": car.name,
-                        "price": car.price,
-                        "type": car.type(),
-                        "color": doc.prepare_color(None),
-                    },
-                    "_index": "car_index",
+        doc.update([car, car2], action="update")
+        actions = [
+            {
+                "_id": car.pk,
+                "_op_type": "update",
+                "doc": {
+                    "name": car.name,
+                    "price": car.price,
+                    "type": car.type(),
+                    "color": doc.prepare_color(None),
                 },
-                {
-                    "_id": car2.pk,
-                    "_op_type": "update",
-                    "doc": {
-                        "name": car2.name,
-                        "price": car2.price,
-                        "type": car2.type(),
-                        "color": doc.prepare_color(None),
-                    },
-                    "_index": "car_index",
+                "_index": "car_index",
+            },
+            {
+                "_id": car2.pk,
+                "_op_type": "update",
+                "doc": {
+                    "name": car2.name,
+                    "price": car2.price,
+                    "type": car2.type(),
+                    "color": doc.prepare_color(None),
                 },
-            ]
-            self.assertEqual(1, mock.call_count)
-            self.assertEqual(actions, list(mock.call_args_list[0][1]["actions"]))
-            self.assertTrue(mock.call_args_list[0][1]["refresh"])
-            self.assertEqual(doc._index.connection, mock.call_args_list[0][1]["client"])
-
-    def test_model_instance_update_no_refresh(self):
-        doc = CarDocument()
-        doc.Index.auto_refresh = False
-        car = Car()
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "index")
-            self.assertEqual(mock.call_args_list[0][1]["refresh"], False)
-
-    def test_model_instance_update_refresh_true(self):
-        doc = CarDocument()
-        doc.Index.auto_refresh = False
-        car = Car()
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "index", refresh=True)
-            self.assertEqual(mock.call_args_list[0][1]["refresh"], True)
-
-    def test_model_instance_update_refresh_wait_for(self):
-        doc = CarDocument()
-        doc.Index.auto_refresh = False
-        car = Car()
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "index", refresh="wait_for")
-            self.assertEqual(mock.call_args_list[0][1]["refresh"], "wait_for")
-
-    def test_model_instance_update_auto_refresh_wait_for(self):
-        doc = CarDocument()
-        doc.Index.auto_refresh = "wait_for"
-        car = Car()
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "index")
-            self.assertEqual(mock.call_args_list[0][1]["refresh"], "wait_for")
-
-    def test_model_instance_update_refresh_overrides_auto_refresh(self):
+                "_index": "car_index",
+            },
+        ]
+        call = self.mock_bulk.call_args_list[0][1]
+        self.assertEqual(1, self.mock_bulk.call_count)
+        self.assertEqual(actions, list(call["actions"]))
+        self.assertTrue(call["refresh"])
+        self.assertEqual(doc._index.connection, call["client"])
+
+    def test_model_instance_update_refresh_matrix(self):
+        """`refresh` should follow `Index.auto_refresh` unless given explicitly."""
         doc = CarDocument()
-        doc.Index.auto_refresh = True
         car = Car()
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "index", refresh=False)
-            self.assertEqual(mock.call_args_list[0][1]["refresh"], False)
+        cases = [
+            (True, _unset, True),
+            (False, _unset, False),
+            (False, True, True),
+            (False, "wait_for", "wait_for"),
+            ("wait_for", _unset, "wait_for"),
+            (True, False, False),
+        ]
+        self.addCleanup(setattr, doc.Index, "auto_refresh", doc.Index.auto_refresh)
+        for auto_refresh, refresh, expected in cases:
+            with self.subTest(auto_refresh=auto_refresh, refresh=refresh):
+                self.mock_bulk.reset_mock()
+                doc.Index.auto_refresh = auto_refresh
+                kwargs = {} if refresh is _unset else {"refresh": refresh}
+                doc.update(car, "index", **kwargs)
+                self.assertEqual(self.mock_bulk.call_args_list[0][1]["refresh"], expected)
 
     def test_model_instance_update_using(self):
         doc = CarDocument()
         car = Car()
 
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "index")
-            doc.update(car, "index", using="dummy")
-            self.assertEqual(
-                mock.call_args_list[0][1]["client"].transport.hosts,
-                settings.OPENSEARCH_DSL["default"]["hosts"],
-            )
-            self.assertEqual(
-                mock.call_args_list[1][1]["client"].transport.hosts,
-                settings.OPENSEARCH_DSL["dummy"]["hosts"],
-            )
+        doc.update(car, "index")
+        doc.update(car, "index", using="dummy")
+        self.assertEqual(
+            self.mock_bulk.call_args_list[0][1]["client"].transport.hosts,
+            settings.OPENSEARCH_DSL["default"]["hosts"],
+        )
+        self.assertEqual(
+            self.mock_bulk.call_args_list[1][1]["client"].transport.hosts,
+            settings.OPENSEARCH_DSL["dummy"]["hosts"],
+        )
+        # Clients are reused per alias, repeated updates share them.
+        self.assertIs(self.mock_bulk.call_args_list[0][1]["client"], connections.get_connection("default"))
+        self.assertIs(self.mock_bulk.call_args_list[1][1]["client"], connections.get_connection("dummy"))
 
     def test_model_instance_update_limit_fields(self):
         doc = CarDocument()
         car = Car()
 
-        with patch("django_opensearch_dsl.documents.bulk") as mock:
-            doc.update(car, "update", limit_fields=["price"])
-            self.assertEqual(
-                list(mock.call_args_list[0][1]["actions"])[0]["doc"],
-                {"price": car.price},
-            )
+        doc.update(car, "update", limit_fields=["price"])
+        actions = list(self.mock_bulk.call_args_list[0][1]["actions"])
+        self.assertEqual(actions[0]["doc"], {"price": car.price})
 
     def test_model_instance_iterable_update_with_pagination(self):
-        class CarDocument2(Document):
-            class Django:
-                model = Car
-                queryset_pagination = 2
-
         doc = CarDocument()
         car1 = Car()
         car2 = Car()
         car3 = Car()
 
-        bulk = "django_opensearch_dsl.documents.bulk"
-        parallel_bulk = "django_opensearch_dsl.documents.parallel_bulk"
-        with patch(bulk) as mock_bulk, patch(parallel_bulk) as mock_parallel_bulk:
-            doc.update([car1, car2, car3], "index")
-            self.assertEqual(3, len(list(mock_bulk.call_args_list[0][1]["actions"])))
-            self.assertEqual(mock_bulk.call_count, 1, "bulk is called")
-            self.assertEqual(mock_parallel_bulk.call_count, 0, "parallel bulk is not called")
+        doc.update([car1, car2, car3], "index")
+        actions = list(self.mock_bulk.call_args_list[0][1]["actions"])
+        self.assertEqual(3, len(actions))
+        self.assertEqual(self.mock_bulk.call_count, 1, "bulk is called")
+        self.assertEqual(self.mock_parallel_bulk.call_count, 0, "parallel bulk is not called")
 
     def test_model_instance_iterable_update_with_parallel(self):
-        class CarDocument2(Document):
-            class Django:
-                model = Car
-
         doc = CarDocument()
         car1 = Car()
         car2 = Car()
         car3 = Car()
-        bulk = "django_opensearch_dsl.documents.bulk"
-        parallel_bulk = "django_opensearch_dsl.documents.parallel_bulk"
-        with patch(bulk) as mock_bulk, patch(parallel_bulk) as mock_parallel_bulk:
-            doc.update([car1, car2, car3], "index", parallel=True)
-            self.assertEqual(mock_bulk.call_count, 0, "bulk is not called")
-            self.assertEqual(mock_parallel_bulk.call_count, 1, "parallel bulk is called")
+        doc.update([car1, car2, car3], "index", parallel=True)
+        self.assertEqual(self.mock_bulk.call_count, 0, "bulk is not called")
+        self.assertEqual(self.mock_parallel_bulk.call_count, 1, "parallel bulk is called")
+        kwargs = self.mock_parallel_bulk.call_args[1]
+        self.assertEqual(kwargs["thread_count"], DODConfig.default_parallel_thread_count())
+        self.assertEqual(kwargs["queue_size"], DODConfig.default_parallel_queue_size())
+        self.assertEqual(kwargs["chunk_size"], doc.django.queryset_pagination)
 
     def test_init_prepare_correct(self):
         """Run init_prepare() run and collect the right preparation functions"""
@@ -393,30 +291,11 @@ class DocumentTestCase(TestCase):
         d = CarDocument()
         self.assertEqual(len(d._prepared_fields), 4)
 
-        expect = {
-            "color": (
-                "<class 'django_opensearch_dsl.fields.TextField'>",
-                ("<class 'method'>", "<type 'instancemethod'>"),
-            ),  # py3, py2
-            "type": (
-                "<class 'django_opensearch_dsl.fields.TextField'>",
-                ("<class 'functools.partial'>", "<type 'functools.partial'>"),
-            ),
-            "name": (
-                "<class 'django_opensearch_dsl.fields.TextField'>",
-                ("<class 'functools.partial'>", "<type 'functools.partial'>"),
-            ),
-            "price": (
-                "<class 'django_opensearch_dsl.fields.DoubleField'>",
-                ("<class 'functools.partial'>", "<type 'functools.partial'>"),
-            ),
-        }
-
         for name, field, prep in d._prepared_fields:
-            e = expect[name]
-            self.assertEqual(str(type(field)), e[0], "field type should be copied over")
-            self.assertTrue("__call__" in dir(prep), "prep function should be callable")
-            self.assertTrue(str(type(prep)) in e[1], "prep function is correct partial or method")
+            exp_field, exp_prep = _EXPECTED_PREP[name]
+            self.assertIsInstance(field, exp_field, "field type should be copied over")
+            self.assertTrue(callable(prep), "prep function should be callable")
+            self.assertIsInstance(prep, exp_prep, "prep function is correct partial or method")
 
     def test_init_prepare_results(self):
         """Are the results from init_prepare() actually used in prepare()?"""
@@ -442,35 +321,18 @@ class DocumentTestCase(TestCase):
             [("name", (), {}), ("price", (), {}), ("type", (), {})],
         )
 
-    # Mock the opensearch connection because we need to execute the bulk so that
-    # the generator got iterated and generate_id called.
-    # If we mock the bulk in django_opensearch_dsl.document
-    # the actual bulk will be never called and the test will fail
-    @patch("opensearchpy.helpers.actions.bulk")
-    def test_default_generate_id_is_called(self, _):
+    def test_default_generate_id_is_called(self):
         article = Article(
             id=124594,
             slug="some-article",
         )
 
-        @registry.register_document
-        class ArticleDocument(Document):
-            class Django:
-                model = Article
-                fields = [
-                    "slug",
-                ]
-
-            class Index:
-                name = "test_articles"
-                settings = {
-                    "number_of_shards": 1,
-                    "number_of_replicas": 0,
-                }
-
         with patch.object(ArticleDocument, "generate_id", return_value=article.id) as patched_method:
             d = ArticleDocument()
             d.update(article, "index")
+            # The actions generator is lazy, generate_id only runs once the
+            # bulk helper consumes it.
+            list(self.mock_bulk.call_args[1]["actions"])
             patched_method.assert_called()
 
     @patch("django_opensearch_dsl.documents.Document.bulk")
@@ -480,90 +342,46 @@ class DocumentTestCase(TestCase):
             slug="some-article-2",
         )
 
-        @registry.register_document
-        class ArticleDocument(Document):
-            class Django:
-                model = Article
-                fields = [
-                    "slug",
-                ]
-
-            class Index:
-                name = "test_articles"
-
-            @classmethod
-            def generate_id(cls, article):
-                return article.slug
-
-        d = ArticleDocument()
+        d = ArticleDocumentCustomId()
         d.update(article, "index", refresh=True)
 
         # Get the data from the opensearch low level API because
         # The generator get executed there.
-        assert list(mock_bulk.call_args[0][0])[0]["_id"] == article.slug
+        actions = list(mock_bulk.call_args[0][0])
+        assert actions[0]["_id"] == article.slug
 
     @override_settings(OPENSEARCH_DSL_INDEX_SETTINGS={"codec": "best_compression"})
     def test_index_settings_default_to_settings(self):
-        @registry.register_document
-        class ArticleDocument(Document):
-            class Django:
-                model = Article
-                fields = [
-                    "slug",
-                ]
-
-            class Index:
-                name = "test_articles"
-
-        self.assertEqual(ArticleDocument._index._settings, {"codec": "best_compression"})
+        document = article_document_with_index_settings()
+        self.assertEqual(document._index._settings, {"codec": "best_compression"})
 
     @override_settings(OPENSEARCH_DSL_INDEX_SETTINGS={"codec": "best_compression"})
     def test_index_settings_use_index_settings_merge_global_settings(self):
-        @registry.register_document
-        class ArticleDocument(Document):
-            class Django:
-                model = Article
-                fields = [
-                    "slug",
-                ]
-
-            class Index:
-                name = "test_articles"
-                settings = {"hidden": True}
-
-        self.assertEqual(ArticleDocument._index._settings, {"codec": "best_compression", "hidden": True})
+        document = article_document_with_index_settings({"hidden": True})
+        self.assertEqual(document._index._settings, {"codec": "best_compression", "hidden": True})
 
     @override_settings(OPENSEARCH_DSL_INDEX_SETTINGS={"codec": "best_compression"})
-    def test_index_settings_use_index_settings_merge_global_settings(self):
-        @registry.register_document
-        class ArticleDocument(Document):
-            class Django:
-                model = Article
-                fields = [
-                    "slug",
-                ]
+    def test_index_settings_use_index_settings_override_global_settings(self):
+        document = article_document_with_index_settings({"hidden": True, "codec": "default"})
+        self.assertEqual(document._index._settings, {"codec": "default", "hidden": True})
 
-            class Index:
-                name = "test_articles"
-                settings = {"hidden": True}
 
-        self.assertEqual(ArticleDocument._index._settings, {"codec": "best_compression", "hidden": True})
+class DocumentDBTestCase(TestCase):
+    """Tests that actually read from the database, with the fixture loaded."""
 
-    @override_settings(OPENSEARCH_DSL_INDEX_SETTINGS={"codec": "best_compression"})
-    def test_index_settings_use_index_settings_override_global_settings(self):
-        @registry.register_document
-        class ArticleDocument(Document):
-            class Django:
-                model = Article
-                fields = [
-                    "slug",
-                ]
-
-            class Index:
-                name = "test_articles"
-                settings = {
-                    "hidden": True,
-                    "codec": "default",
-                }
+    fixtures = ["tests/django_dummy_app/geography_data.json"]
 
-        self.assertEqual(ArticleDocument._index._settings, {"codec": "default", "hidden": True})
+    def test_get_indexing_queryset(self):
+        doc = ContinentDocument()
+        unordered_qs = doc.get_queryset().order_by("?")
+
+        with patch("django_opensearch_dsl.documents.Document.get_queryset") as mock_qs, patch.object(
+            models.QuerySet, "iterator", autospec=True, side_effect=models.QuerySet.iterator
+        ) as mock_iterator:
+            mock_qs.return_value = unordered_qs
+            ordered_continents = list(doc.get_queryset().order_by("pk"))
+            indexing_continents = list(doc.get_indexing_queryset())
+            self.assertEqual(ordered_continents, indexing_continents)
+            # The queryset must be streamed, not sliced page by page.
+            mock_iterator.assert_called_once()
+            self.assertEqual(mock_iterator.call_args[1]["chunk_size"], doc.django.queryset_pagination)